@@ -14,23 +14,49 @@ Example:
 """
 
 import sys
-import json
 import re
 import os
+import functools
 from pathlib import Path
 
+# One multiline pattern matching every line parse_sections cares about, so
+# the whole markdown is scanned by the regex engine instead of a Python
+# per-line loop. Each alternative matches a full line (surrounding spaces
+# allowed, as the line-based parser stripped them); whitespace inside a
+# pattern is [^\S\n] so no match can run across a line break.
+_EVENT_RE = re.compile(
+    r'^[^\S\n]*(?:'
+    # Header/footer line to skip
+    r'(?P<header>ECMA-376 Part \d)[^\n]*'
+    # Page number from pymupdf4llm output: standalone line with 1-4 digits
+    r'|(?P<page>\d{1,4})[^\S\n]*'
+    # TOC entry to skip (has page number at end: "17.3.2 Title ... 264").
+    # Written as "one space, anything, two dots": extra spaces and dots are
+    # absorbed by [^\n]+, so long dot leaders can't backtrack quadratically
+    r'|(?P<toc>\d+(?:\.\d+)*)[^\S\n][^\n]+\.\.[^\S\n]*\d+[^\S\n]*'
+    # Section headers, BOLD only (actual sections, not TOC entries)
+    r'|(?i:'
+    # Main section with bold: **12.3.2** **Title**
+    r'\*\*(?P<sid>\d+(?:\.\d+)*)\*\*[^\S\n]*\*\*(?P<title>[^*\n]+)\*\*[^\S\n]*'
+    # Annex with bold: **Annex A** **(normative)** or **Annex A (informative)**
+    r'|\*\*(?P<annex>Annex[^\S\n]+[A-Z])\*\*[^\S\n]*(?:\*\*)?(?:\((?P<annex_note>[^)\n]+)\))?[^\n]*'
+    r')'
+    r')$',
+    re.MULTILINE,
+)
+
 
 def extract_pdf(pdf_path: str, output_dir: str, page_range: tuple[int, int] | None = None):
     """Extract PDF to markdown using pymupdf4llm."""
     import pymupdf4llm
     import fitz  # pymupdf
+    import orjson
 
     print(f"Loading PDF: {pdf_path}")
 
-    # Get total page count
+    # Open once; the page count and extraction both reuse it
     doc = fitz.open(pdf_path)
-    total_pages = len(doc)
-    doc.close()
+    total_pages = doc.page_count
 
     print(f"PDF loaded: {total_pages} pages")
 
@@ -46,27 +72,32 @@ def extract_pdf(pdf_path: str, output_dir: str, page_range: tuple[int, int] | No
     # Extract to markdown
     print("Extracting text...")
     md_text = pymupdf4llm.to_markdown(
-        pdf_path,
+        doc,
         pages=pages,
         show_progress=True
     )
 
+    doc.close()
+
     # Create output directory
     Path(output_dir).mkdir(parents=True, exist_ok=True)
 
     # Save raw markdown
     md_path = Path(output_dir) / "content.md"
-    with open(md_path, "w", encoding="utf-8") as f:
-        f.write(md_text)
+    md_path.write_text(md_text, encoding="utf-8")
     print(f"Saved markdown to {md_path}")
 
     # Parse sections from markdown
     sections = parse_sections(md_text, page_range[0] if page_range else 1)
 
+    # Section content duplicates the markdown; release the full text before
+    # serializing so peak memory isn't markdown + sections + JSON bytes
+    content_length = len(md_text)
+    del md_text
+
     # Save sections
     sections_path = Path(output_dir) / "sections.json"
-    with open(sections_path, "w", encoding="utf-8") as f:
-        json.dump(sections, f, indent=2)
+    sections_path.write_bytes(orjson.dumps(sections, option=orjson.OPT_INDENT_2))
     print(f"Saved {len(sections)} sections to {sections_path}")
 
     # Save section index (without content)
@@ -81,8 +112,7 @@ def extract_pdf(pdf_path: str, output_dir: str, page_range: tuple[int, int] | No
     } for s in sections]
 
     index_path = Path(output_dir) / "section-index.json"
-    with open(index_path, "w", encoding="utf-8") as f:
-        json.dump(section_index, f, indent=2)
+    index_path.write_bytes(orjson.dumps(section_index, option=orjson.OPT_INDENT_2))
 
     # Save metadata
     metadata = {
@@ -90,129 +120,98 @@ def extract_pdf(pdf_path: str, output_dir: str, page_range: tuple[int, int] | No
         "processedPages": len(pages) if pages else total_pages,
         "pageRange": list(page_range) if page_range else None,
         "sectionsFound": len(sections),
-        "contentLength": len(md_text),
+        "contentLength": content_length,
     }
 
     metadata_path = Path(output_dir) / "metadata.json"
-    with open(metadata_path, "w", encoding="utf-8") as f:
-        json.dump(metadata, f, indent=2)
+    metadata_path.write_bytes(orjson.dumps(metadata, option=orjson.OPT_INDENT_2))
 
     print(f"\nExtraction complete!")
     print(f"  Total pages: {total_pages}")
     print(f"  Processed pages: {metadata['processedPages']}")
     print(f"  Sections found: {len(sections)}")
-    print(f"  Content size: {len(md_text):,} chars")
+    print(f"  Content size: {content_length:,} chars")
 
-    return md_text, sections
+    return sections
 
 
 def parse_sections(md_text: str, start_page: int) -> list[dict]:
     """Parse section structure from markdown text."""
     sections = []
 
-    # Section patterns for ECMA-376
-    # Only match BOLD section headers (actual sections, not TOC entries)
-    patterns = [
-        # Main section with bold: **12.3.2** **Title**
-        r'^\*\*(\d+(?:\.\d+)*)\*\*\s*\*\*([^*]+)\*\*$',
-        # Annex with bold: **Annex A** **(normative)** or **Annex A (informative)**
-        r'^\*\*(Annex\s+[A-Z])\*\*\s*(?:\*\*)?(?:\(([^)]+)\))?(?:\*\*)?\s*(.*)$',
-    ]
-
-    # TOC pattern to skip (has page number at end: "17.3.2 Title ... 264")
-    toc_pattern = r'^\d+(?:\.\d+)*\s+.+\.{2,}\s*\d+$'
-
-    # Page number patterns from pymupdf4llm output
-    # Arabic numerals (main content): standalone line with just digits
-    arabic_page_pattern = r'^(\d+)$'
-    # Header/footer line to skip
-    header_pattern = r'^ECMA-376 Part \d'
-
-    lines = md_text.split('\n')
     current_section = None
-    current_content = []
+    # Content is kept as slices of md_text; skipped lines (headers, page
+    # numbers, TOC entries) split a section into several parts
+    current_parts = []
+    part_start = 0
     current_page = start_page
 
-    for line in lines:
-        stripped = line.strip()
-
-        # Skip header/footer lines
-        if re.match(header_pattern, stripped):
-            continue
-
-        # Track page numbers - standalone arabic numerals
-        if re.match(arabic_page_pattern, stripped):
-            page_num = int(stripped)
+    for match in _EVENT_RE.finditer(md_text):
+        page = match["page"]
+        if page is not None:
+            page_num = int(page)
             # Sanity check: page should increase or be close to current
-            if page_num >= current_page and page_num < current_page + 50:
-                current_page = page_num
-                continue  # Don't include page number in content
+            if not (page_num >= current_page and page_num < current_page + 50):
+                continue  # Not a page number; stays in content
+            current_page = page_num
 
-        # Skip TOC entries (have page numbers at the end with dots)
-        if re.match(toc_pattern, stripped):
+        if match["sid"] is None and match["annex"] is None:
+            # Page number, header/footer or TOC entry: drop the line from content
+            if current_section:
+                current_parts.append(md_text[part_start:match.start()])
+            part_start = match.end() + 1
             continue
 
-        # Check for section headers (bold only - actual sections)
-        section_match = None
-        for pattern in patterns:
-            match = re.match(pattern, stripped, re.IGNORECASE)
-            if match:
-                section_match = match
-                break
-
-        if section_match:
-            # Save previous section
-            if current_section:
-                current_section["content"] = '\n'.join(current_content).strip()
-                current_section["pageEnd"] = current_page + 1  # +1 to match TOC
-                sections.append(current_section)
-
-            # Start new section
-            groups = section_match.groups()
-            section_id = groups[0]
-            title = groups[1] if len(groups) > 1 else ""
-
-            # Calculate depth
-            if section_id.startswith("Annex"):
-                depth = 1
-            else:
-                depth = section_id.count('.') + 1
-
-            # Get parent ID
-            parent_id = get_parent_section_id(section_id)
-
-            current_section = {
-                "sectionId": section_id,
-                "title": (title or "").strip(),
-                "pageStart": current_page + 1,  # +1 to match TOC page numbers
-                "pageEnd": current_page + 1,
-                "content": "",
-                "depth": depth,
-                "parentId": parent_id,
-            }
-            current_content = [line]
-        elif current_section:
-            current_content.append(line)
+        # Save previous section
+        if current_section:
+            current_parts.append(md_text[part_start:match.start()])
+            current_section["content"] = ''.join(current_parts).strip()
+            current_section["pageEnd"] = current_page + 1  # +1 to match TOC
+            sections.append(current_section)
+
+        # Start new section
+        section_id = match["sid"] or match["annex"]
+        title = match["title"] or match["annex_note"]
+
+        # Calculate depth
+        if section_id.startswith("Annex"):
+            depth = 1
+        else:
+            depth = section_id.count('.') + 1
+
+        # Get parent ID
+        parent_id = get_parent_section_id(section_id)
+
+        current_section = {
+            "sectionId": section_id,
+            "title": (title or "").strip(),
+            "pageStart": current_page + 1,  # +1 to match TOC page numbers
+            "pageEnd": current_page + 1,
+            "content": "",
+            "depth": depth,
+            "parentId": parent_id,
+        }
+        current_parts = []
+        part_start = match.start()
 
     # Don't forget the last section
     if current_section:
-        current_section["content"] = '\n'.join(current_content).strip()
+        current_parts.append(md_text[part_start:])
+        current_section["content"] = ''.join(current_parts).strip()
         current_section["pageEnd"] = current_page + 1  # +1 to match TOC
         sections.append(current_section)
 
     return sections
 
 
+@functools.lru_cache(maxsize=None)
 def get_parent_section_id(section_id: str) -> str | None:
     """Get parent section ID from a section ID."""
     if section_id.startswith("Annex"):
         return None
 
-    parts = section_id.split('.')
-    if len(parts) <= 1:
-        return None
-
-    return '.'.join(parts[:-1])
+    parent, sep, _ = section_id.rpartition('.')
+    return parent if sep else None
 
 
 def main():
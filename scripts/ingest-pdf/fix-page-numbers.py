@@ -12,62 +12,119 @@ Example:
 """
 
 import sys
-import json
+import io
+import os
 import re
+import traceback
+from collections.abc import Iterable
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout
 from pathlib import Path
 
+import orjson
 
-def parse_sections_for_pages(md_text: str, start_page: int = 1) -> dict[str, int]:
-    """Parse section IDs and their page numbers from markdown."""
-    section_pages = {}
+# Bold section header patterns, fused into one alternation
+_SECTION_RE = re.compile(
+    # Part 1 style: **12.3.2** **Title**
+    r'^(?:\*\*(?P<sid>\d+(?:\.\d+)*)\*\*\s*\*\*[^*]+\*\*$'
+    # Part 2/3/4 style: # **12.3.2. Title** or # **12. Title**
+    r'|#+\s*\*\*(?P<hid>\d+(?:\.\d+)*)\.?\s+[^*]+\*\*$'
+    # Annex
+    r'|\*\*(?P<annex>Annex\s+[A-Z])\*\*\s*(?:\*\*)?(?:\([^)]+\))?(?:\*\*)?\s*.*$)',
+    re.IGNORECASE,
+)
+
+# Same as \s+.+\.{2,} (extra spaces/dots fall into .+) but without the
+# quadratic backtracking on long dot leaders
+_TOC_RE = re.compile(r'^\d+(?:\.\d+)*\s.+\.\.\s*\d+$')
+_HEADER_RE = re.compile(r'^ECMA-376 Part \d')
+
+# Every section header pattern starts with one of these characters
+_SECTION_FIRST_CHARS = frozenset("*#")
+
+# content.md runs to many MB; stream it through a large read buffer
+_IO_BUFFER_SIZE = 64 * 1024
+
+# Bump when parse_sections_for_pages changes so stale page caches are ignored
+_PAGES_CACHE_VERSION = 1
+
+
+def parse_sections_for_pages(lines: Iterable[str], start_page: int = 1) -> dict[str, int]:
+    """Parse section IDs and their page numbers from markdown lines.
 
-    # Bold section header patterns
-    patterns = [
-        # Part 1 style: **12.3.2** **Title**
-        r'^\*\*(\d+(?:\.\d+)*)\*\*\s*\*\*([^*]+)\*\*$',
-        # Part 2/3/4 style: # **12.3.2. Title** or # **12. Title**
-        r'^#+\s*\*\*(\d+(?:\.\d+)*)\.?\s+([^*]+)\*\*$',
-        # Annex
-        r'^\*\*(Annex\s+[A-Z])\*\*\s*(?:\*\*)?(?:\(([^)]+)\))?(?:\*\*)?\s*(.*)$',
-    ]
-
-    toc_pattern = r'^\d+(?:\.\d+)*\s+.+\.{2,}\s*\d+$'
-    arabic_page_pattern = r'^(\d+)$'
-    header_pattern = r'^ECMA-376 Part \d'
-
-    lines = md_text.split('\n')
+    Accepts any iterable of lines, so an open file can be streamed through
+    without holding the whole markdown in memory.
+    """
+    section_pages = {}
     current_page = start_page
 
     for line in lines:
         stripped = line.strip()
+        # Cheap first-character gate so most lines never reach a regex
+        first = stripped[:1]
 
         # Skip headers
-        if re.match(header_pattern, stripped):
+        if stripped.startswith("ECMA-376 Part") and _HEADER_RE.match(stripped):
             continue
 
-        # Track page numbers
-        if re.match(arabic_page_pattern, stripped):
-            page_num = int(stripped)
-            if page_num >= current_page and page_num < current_page + 50:
-                current_page = page_num
+        if first.isdigit():
+            # Track page numbers: standalone line with 1-4 digits. isdecimal
+            # (not isdigit) so superscripts like "²" never reach int()
+            if len(stripped) <= 4 and stripped.isdecimal():
+                page_num = int(stripped)
+                if current_page <= page_num < current_page + 50:
+                    current_page = page_num
+                    continue
+
+            # Skip TOC entries (always have a ".." dot leader)
+            if ".." in stripped and _TOC_RE.match(stripped):
                 continue
 
-        # Skip TOC entries
-        if re.match(toc_pattern, stripped):
+        if first not in _SECTION_FIRST_CHARS:
             continue
 
         # Check for section headers
-        for pattern in patterns:
-            match = re.match(pattern, stripped, re.IGNORECASE)
-            if match:
-                section_id = match.group(1)
-                # +1 to match TOC page numbers
-                section_pages[section_id] = current_page + 1
-                break
+        match = _SECTION_RE.match(stripped)
+        if match:
+            section_id = match["sid"] or match["hid"] or match["annex"]
+            # +1 to match TOC page numbers
+            section_pages[section_id] = current_page + 1
 
     return section_pages
 
 
+def load_section_pages(content_path: Path) -> dict[str, int]:
+    """Parse section page numbers from content.md, using a sidecar cache.
+
+    content.md doesn't change between runs, so the parsed result is stored
+    next to it in content.md.pages.json, keyed by the file's mtime and size.
+    """
+    cache_path = content_path.with_name(content_path.name + ".pages.json")
+    stat = content_path.stat()
+    key = [_PAGES_CACHE_VERSION, stat.st_mtime_ns, stat.st_size]
+
+    if cache_path.exists():
+        try:
+            cached = orjson.loads(cache_path.read_bytes())
+            if cached.get("key") == key:
+                print(f"  Using cached page numbers from {cache_path}")
+                return cached["sectionPages"]
+        except (OSError, ValueError, KeyError, AttributeError):
+            pass  # Unreadable or corrupt cache - re-parse and overwrite it
+
+    print(f"  Parsing {content_path}...")
+    with open(content_path, encoding="utf-8", buffering=_IO_BUFFER_SIZE) as f:
+        section_pages = parse_sections_for_pages(f)
+
+    # The cache is only an optimization; a failed write (e.g. read-only
+    # extracted/ dir) shouldn't abort the part after a successful parse
+    try:
+        cache_path.write_bytes(orjson.dumps({"key": key, "sectionPages": section_pages}))
+    except OSError as e:
+        print(f"  Warning: could not write page cache {cache_path}: {e}")
+    return section_pages
+
+
 def fix_embedded_file(part_number: int):
     """Fix page numbers in embedded JSON file."""
     base_dir = Path("dev/data")
@@ -85,17 +142,12 @@ def fix_embedded_file(part_number: int):
     print(f"Processing part {part_number}...")
 
     # Parse content.md for section page numbers
-    print(f"  Parsing {content_path}...")
-    with open(content_path) as f:
-        content = f.read()
-
-    section_pages = parse_sections_for_pages(content)
+    section_pages = load_section_pages(content_path)
     print(f"  Found {len(section_pages)} sections with page numbers")
 
     # Load embedded chunks
     print(f"  Loading {embedded_path}...")
-    with open(embedded_path) as f:
-        chunks = json.load(f)
+    chunks = orjson.loads(embedded_path.read_bytes())
 
     print(f"  Loaded {len(chunks)} chunks")
 
@@ -104,28 +156,56 @@ def fix_embedded_file(part_number: int):
     missing = set()
     for chunk in chunks:
         section_id = chunk.get("sectionId")
-        if section_id and section_id in section_pages:
-            old_page = chunk.get("pageNumber")
-            new_page = section_pages[section_id]
-            if old_page != new_page:
-                chunk["pageNumber"] = new_page
-                updated += 1
-        elif section_id:
+        if not section_id:
+            continue
+        # Single dict lookup: None means the section wasn't parsed
+        new_page = section_pages.get(section_id)
+        if new_page is None:
             missing.add(section_id)
+        elif chunk.get("pageNumber") != new_page:
+            chunk["pageNumber"] = new_page
+            updated += 1
 
     print(f"  Updated {updated} chunks")
     if missing:
         print(f"  Warning: {len(missing)} sections not found in parsed content")
 
+    # Nothing changed - don't rewrite a file that's mostly embedding vectors
+    if updated == 0:
+        print(f"  No changes; skipping write")
+        return True
+
     # Save updated file
     print(f"  Saving {embedded_path}...")
-    with open(embedded_path, "w") as f:
-        json.dump(chunks, f, indent=2)
+    # Compact output: this file is only read back by upload.ts
+    # Write to a temp file and rename over the original so a crash mid-write
+    # can't leave a truncated embedded file behind
+    tmp_path = embedded_path.with_suffix(".json.tmp")
+    tmp_path.write_bytes(orjson.dumps(chunks))
+    os.replace(tmp_path, embedded_path)
 
     print(f"  Done!")
     return True
 
 
+def fix_embedded_file_quiet(part_number: int) -> tuple[bool, str]:
+    """Run fix_embedded_file, returning its log instead of printing it.
+
+    Used when parts run in parallel so each part's output stays in one block.
+    Exceptions are caught and their traceback appended to the log, so one
+    failing part can't discard the logs of parts that already succeeded.
+    """
+    log = io.StringIO()
+    with redirect_stdout(log):
+        try:
+            ok = fix_embedded_file(part_number)
+        except Exception:
+            print(f"ERROR: Part {part_number} failed")
+            traceback.print_exc(file=log)
+            ok = False
+    return ok, log.getvalue()
+
+
 def main():
     if len(sys.argv) < 2:
         print("Usage: python scripts/ingest/fix-page-numbers.py <part-number|all>")
@@ -146,10 +226,20 @@ def main():
             print(f"Invalid part number: {arg}")
             sys.exit(1)
 
-    for part in parts:
-        if not fix_embedded_file(part):
+    if len(parts) > 1:
+        # Parts are independent (own content.md and embedded JSON), so run
+        # them in parallel processes; the regex scan is CPU-bound
+        with ProcessPoolExecutor(max_workers=len(parts)) as executor:
+            results = list(executor.map(fix_embedded_file_quiet, parts))
+        for _, log in results:
+            print(log)
+        if not all(ok for ok, _ in results):
             sys.exit(1)
-        print()
+    else:
+        for part in parts:
+            if not fix_embedded_file(part):
+                sys.exit(1)
+            print()
 
     print("All done! Now run upload.ts to update the database.")
 
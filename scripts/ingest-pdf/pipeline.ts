@@ -78,7 +78,7 @@ async function main() {
 	console.log("\n[1/4] Extracting PDF...");
 	console.log("-".repeat(40));
 
-	// Try different Python paths (pymupdf4llm may be installed in a specific version)
+	// Try different Python paths (pymupdf4llm/orjson may be installed in a specific version)
 	const pythonPaths = [
 		process.env.PYTHON_PATH,
 		"/opt/homebrew/bin/python3.10",
@@ -90,7 +90,7 @@ async function main() {
 	let extractSuccess = false;
 	for (const pythonPath of pythonPaths) {
 		try {
-			await $`${pythonPath} -c "import pymupdf4llm" 2>/dev/null`;
+			await $`${pythonPath} -c "import pymupdf4llm, orjson" 2>/dev/null`;
 			console.log(`Using Python: ${pythonPath}`);
 			await $`${pythonPath} scripts/ingest-pdf/extract.py ${pdfPath} ${extractedDir}`;
 			extractSuccess = true;
@@ -101,7 +101,7 @@ async function main() {
 	}
 
 	if (!extractSuccess) {
-		console.error("Failed to find Python with pymupdf4llm installed.");
+		console.error("Failed to find Python with pymupdf4llm and orjson installed.");
 		console.error("Install with: pip install -r scripts/requirements.txt");
 		console.error("Or set PYTHON_PATH environment variable.");
 		process.exit(1);